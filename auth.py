@@ -1,6 +1,7 @@
 # auth.py (robust version)
-import os, json, logging
-from typing import Optional, Dict, Any, List
+import os, json, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any
 
 _logger = logging.getLogger(__name__)
 
@@ -13,25 +14,92 @@ def try_import(name: str):
         _logger.warning("Optional import failed: %s -> %s", name, e)
         return None
 
-# Try lazy imports
-pymongo = try_import("pymongo")
-bcrypt = try_import("bcrypt")
+_lazy_modules: Dict[str, Any] = {}
+
+def lazy_import(name: str):
+    # import on first use and memoise the result (None if unavailable)
+    if name not in _lazy_modules:
+        _lazy_modules[name] = try_import(name)
+    return _lazy_modules[name]
+
+def __getattr__(name: str):
+    # keep `auth.pymongo` / `auth.bcrypt` working without importing them at module load
+    if name in ("pymongo", "bcrypt"):
+        return lazy_import(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 import streamlit as st
 
-# If bcrypt is missing we will use a not-very-secure fallback for development only.
+_DEFAULT_BCRYPT_COST = 12
+
+def _bcrypt_cost() -> int:
+    # bcrypt work factor (2**cost rounds); lower it via env for dev/test machines.
+    # Bad values must not break `import auth`, so fall back to the default / clamp to 4-31.
+    raw = os.environ.get("BCRYPT_COST")
+    if raw is None:
+        return _DEFAULT_BCRYPT_COST
+    try:
+        cost = int(raw)
+    except ValueError:
+        _logger.warning("Invalid BCRYPT_COST %r; using %d", raw, _DEFAULT_BCRYPT_COST)
+        return _DEFAULT_BCRYPT_COST
+    if not 4 <= cost <= 31:
+        _logger.warning("BCRYPT_COST %d outside 4-31; clamping", cost)
+    return min(max(cost, 4), 31)
+
+BCRYPT_COST = _bcrypt_cost()
+
+# Password verification runs here: argon2-cffi and bcrypt release the GIL while
+# hashing, and the pool caps concurrent hash work at one stream per core.
+_EXEC = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="auth-pw")
+
+_argon2_hasher = None
+
+def _get_argon2_hasher():
+    # argon2-cffi is preferred for new hashes; built on first use, None if not installed
+    global _argon2_hasher
+    if _argon2_hasher is None:
+        argon2 = lazy_import("argon2")
+        if argon2:
+            _argon2_hasher = argon2.PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+    return _argon2_hasher
+
+# New hashes use argon2, then bcrypt; if both are missing we use a
+# not-very-secure fallback for development only.
 def _hash_pw(password: str) -> str:
+    ph = _get_argon2_hasher()
+    if ph:
+        return ph.hash(password)
+    bcrypt = lazy_import("bcrypt")
     if bcrypt:
-        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_COST)).decode("utf-8")
     # fallback (NOT for production): prefix the password so stored value isn't plain
     return "devhash$" + password
 
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
 def _check_pw(password: str, stored: str) -> bool:
-    if bcrypt and stored and stored.startswith("$2b$") or (bcrypt and stored.startswith("$2a$")):
+    if not stored:
+        return False
+    if stored.startswith("$argon2"):
+        ph = _get_argon2_hasher()
+        if not ph:
+            return False
         try:
-            return bcrypt.checkpw(password.encode("utf-8"), stored.encode("utf-8"))
+            return _EXEC.submit(ph.verify, stored, password).result()
         except Exception:
             return False
-    if stored and stored.startswith("devhash$"):
+    # existing bcrypt hashes keep verifying; only enter the (deliberately slow)
+    # bcrypt check for hashes that can actually match
+    if stored[:4] in _BCRYPT_PREFIXES:
+        bcrypt = lazy_import("bcrypt")
+        if not bcrypt:
+            return False
+        try:
+            return _EXEC.submit(bcrypt.checkpw, password.encode("utf-8"), stored.encode("utf-8")).result()
+        except Exception:
+            return False
+    if stored.startswith("devhash$"):
         return stored == "devhash$" + password
     return False
 
@@ -40,44 +108,84 @@ class AuthManager:
         self.local_store = os.path.abspath(local_store)
         self.users_collection = None
         self._use_mongo = False
+        # False when the unique username index couldn't be created; create_user then pre-checks
+        self._username_indexed = False
+        # parsed local store, reused until the file's mtime changes
+        self._cache: Optional[Dict[str, Any]] = None
+        self._cache_mtime = 0.0
+        # serialises read-modify-write of the local store (default admin is created off-thread)
+        self._lock = threading.Lock()
+
+        try:
+            mongo_conf = st.secrets.get("mongo", None)
+        except Exception:
+            mongo_conf = None
 
+        # only pay for the pymongo import when a mongo block is actually configured
+        pymongo = lazy_import("pymongo") if mongo_conf and "uri" in mongo_conf and mongo_conf["uri"] else None
         if pymongo:
             try:
-                mongo_conf = st.secrets.get("mongo", None)
-                if mongo_conf and "uri" in mongo_conf and mongo_conf["uri"]:
-                    client = pymongo.MongoClient(mongo_conf["uri"], serverSelectionTimeoutMS=5000)
-                    client.server_info()  # verify connection
-                    db_name = mongo_conf.get("db", "customer_dashboard")
-                    db = client.get_database(db_name)
-                    self.users_collection = db["users"]
-                    self._use_mongo = True
-                    _logger.info("Auth: connected to MongoDB")
+                client = pymongo.MongoClient(mongo_conf["uri"], serverSelectionTimeoutMS=5000)
+                client.server_info()  # verify connection
+                db_name = mongo_conf.get("db", "customer_dashboard")
+                db = client.get_database(db_name)
+                self.users_collection = db["users"]
+                self._use_mongo = True
+                _logger.info("Auth: connected to MongoDB")
             except Exception as e:
                 _logger.warning("Auth: MongoDB init failed: %s", e)
                 self._use_mongo = False
 
+        if self._use_mongo:
+            # unique index lets create_user insert in one round-trip and rely on DuplicateKeyError;
+            # existing duplicate usernames or a role without createIndex must not drop us off Mongo
+            try:
+                self.users_collection.create_index("username", unique=True)
+                self._username_indexed = True
+            except Exception as e:
+                _logger.warning("Auth: could not create unique username index: %s", e)
+
         # ensure local file exists
         if not os.path.exists(self.local_store):
             with open(self.local_store, "w", encoding="utf-8") as f:
-                json.dump([], f)
+                json.dump({"users": {}}, f)
 
         # create default admin in local store if none exist (only local fallback)
         if not self._use_mongo:
-            users = self._read_local()
+            users = self._read_local()["users"]
             if not users:
-                self.create_user("admin", "admin123", role="admin")
+                # hashing is slow by design; don't block first paint of the login page on it
+                threading.Thread(target=self._create_default_admin, daemon=True).start()
 
-    def _read_local(self) -> List[Dict[str, Any]]:
+    def _create_default_admin(self) -> None:
         try:
+            self.create_user("admin", "admin123", role="admin")
+        except Exception as e:
+            _logger.warning("Auth: default admin creation failed: %s", e)
+
+    def _read_local(self) -> Dict[str, Any]:
+        # returns {"users": {username: user_doc}}; older list-based files are migrated on load
+        try:
+            mtime = os.path.getmtime(self.local_store)
+            if self._cache is not None and mtime == self._cache_mtime:
+                return self._cache
             with open(self.local_store, "r", encoding="utf-8") as f:
                 data = json.load(f)
-                return data if isinstance(data, list) else []
         except Exception:
-            return []
+            return {"users": {}}
+        if isinstance(data, list):
+            # migrate in memory only: reads never write (the store may be read-only);
+            # the new format is persisted by the next create_user
+            data = {"users": {u["username"]: u for u in data if isinstance(u, dict) and u.get("username")}}
+        elif not isinstance(data, dict) or not isinstance(data.get("users"), dict):
+            return {"users": {}}
+        self._cache, self._cache_mtime = data, mtime
+        return data
 
-    def _write_local(self, data: List[Dict[str, Any]]) -> None:
+    def _write_local(self, data: Dict[str, Any]) -> None:
         with open(self.local_store, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        self._cache, self._cache_mtime = data, os.path.getmtime(self.local_store)
 
     def create_user(self, username: str, password: str, role: str = "user") -> None:
         if not username or not password:
@@ -86,15 +194,23 @@ class AuthManager:
         hashed = _hash_pw(password)
         user_doc = {"username": username, "password": hashed, "role": role}
         if self._use_mongo and self.users_collection is not None:
-            if self.users_collection.count_documents({"username": username}) > 0:
+            if not self._username_indexed and self.users_collection.count_documents({"username": username}) > 0:
+                raise ValueError("user exists")
+            pymongo = lazy_import("pymongo")
+            try:
+                self.users_collection.insert_one(user_doc)
+            except pymongo.errors.DuplicateKeyError:
                 raise ValueError("user exists")
-            self.users_collection.insert_one(user_doc)
             return
-        data = self._read_local()
-        if any(u.get("username") == username for u in data):
-            raise ValueError("user exists")
-        data.append(user_doc)
-        self._write_local(data)
+        with self._lock:
+            data = self._read_local()
+            if username in data["users"]:
+                raise ValueError("user exists")
+            # build a new store rather than mutating the cached one; _write_local only
+            # swaps it into the cache once it is safely on disk
+            users = dict(data["users"])
+            users[username] = user_doc
+            self._write_local({**data, "users": users})
 
     def authenticate(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         if not username or not password:
@@ -106,8 +222,7 @@ class AuthManager:
             if _check_pw(password, doc.get("password", "")):
                 return {"username": doc.get("username"), "role": doc.get("role", "user")}
             return None
-        data = self._read_local()
-        doc = next((u for u in data if u.get("username") == username), None)
+        doc = self._read_local()["users"].get(username)
         if not doc: return None
         if _check_pw(password, doc.get("password", "")):
             return {"username": doc.get("username"), "role": doc.get("role", "user")}
@@ -117,4 +232,4 @@ class AuthManager:
         if self._use_mongo and self.users_collection is not None:
             return list(self.users_collection.find({}, {"password": 0, "_id": 0}))
         data = self._read_local()
-        return [{"username": u.get("username"), "role": u.get("role")} for u in data]
+        return [{"username": u.get("username"), "role": u.get("role")} for u in data["users"].values()]
@@ -15,14 +15,9 @@
 # If you do not set MongoDB secrets, the app will fall back to a small local JSON store for users.
 
 # ------------------------- app.py -------------------------
+import os
 import streamlit as st
 from auth import AuthManager
-from data_utils import DataManager
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-import altair as alt
-from datetime import datetime
 
 st.set_page_config(layout="wide", page_title="Customer Revenue & Churn Intelligence")
 
@@ -30,8 +25,13 @@ st.set_page_config(layout="wide", page_title="Customer Revenue & Churn Intellige
 CSV_PATH = "/mnt/data/7982c6fa-dd11-4c21-8843-813b9667a239-project1-retail-raw-dataset.csv"
 
 # --- init managers ---
-auth = AuthManager()
-data_mgr = DataManager(csv_path=CSV_PATH)
+# one AuthManager per server process, shared across reruns and sessions, so its
+# parsed user store (and Mongo connection) is reused instead of rebuilt each rerun
+@st.cache_resource(show_spinner=False)
+def get_auth():
+    return AuthManager()
+
+auth = get_auth()
 
 # --- Login page ---
 st.sidebar.title("Login")
@@ -69,9 +69,17 @@ if 'user' not in st.session_state:
 
 user = st.session_state['user']
 
+# Dashboard-only imports: deferred past the login gate so the login page
+# doesn't pay for loading the data and charting stacks.
+import altair as alt
+from data_utils import DataManager, load_and_prepare, filter_frame, filtered_aggregates
+
+data_mgr = DataManager(csv_path=CSV_PATH)
+
 # Load & preprocess data (done once and cached)
 with st.spinner("Loading and preparing dataset..."):
-    df = data_mgr.load_and_prepare()
+    csv_mtime = os.path.getmtime(CSV_PATH)
+    df = load_and_prepare(CSV_PATH, csv_mtime)
 
 # Top bar: Overview KPIs
 st.header("Customer Revenue & Churn Intelligence Dashboard")
@@ -91,17 +99,16 @@ col4.metric("Avg Order Value", f"₹{avg_order_value:,.0f}")
 
 # Filters
 st.sidebar.markdown("## Filters")
-city_filter = st.sidebar.multiselect("City", options=sorted(df['city'].dropna().unique()), default=sorted(df['city'].dropna().unique()))
-segment_filter = st.sidebar.multiselect("Segment", options=sorted(df['segment'].dropna().unique()), default=sorted(df['segment'].dropna().unique()))
+city_filter = st.sidebar.multiselect("City", options=df.attrs['city_options'], default=df.attrs['city_options'])
+segment_filter = st.sidebar.multiselect("Segment", options=df.attrs['segment_options'], default=df.attrs['segment_options'])
 date_range = st.sidebar.date_input("Date range", value=(df['order_date'].min(), df['order_date'].max()))
 
 # apply filters
-df_filtered = df[(df['city'].isin(city_filter)) & (df['segment'].isin(segment_filter)) & (df['order_date'] >= pd.to_datetime(date_range[0])) & (df['order_date'] <= pd.to_datetime(date_range[1]))]
+df_filtered = filter_frame(df, city_filter, segment_filter, date_range)
+rev_trend, churn_trend, by_segment, seg_city_churn, customer_options = filtered_aggregates(CSV_PATH, csv_mtime, city_filter, segment_filter, date_range, df_filtered)
 
 # Revenue trend & churn trend
 st.subheader("Revenue & Churn Trends")
-rev_trend = df_filtered.groupby('order_month').agg({'revenue':'sum'}).reset_index()
-churn_trend = df_filtered.groupby('order_month').agg({'churn_flag':'sum'}).reset_index()
 
 chart1, chart2 = st.columns(2)
 with chart1:
@@ -122,7 +129,7 @@ if search_term:
 
 # Customer profile view
 st.markdown("---")
-selected_customer = st.selectbox("Select customer to view profile", options=sorted(df_filtered['customer_name'].dropna().unique()))
+selected_customer = st.selectbox("Select customer to view profile", options=customer_options)
 if selected_customer:
     profile = data_mgr.customer_profile(df_filtered, selected_customer)
     st.write(profile['summary'])
@@ -133,17 +140,16 @@ if selected_customer:
 
 # Churn & Risk analysis
 st.subheader("Churn & Risk Analysis")
-by_segment = df_filtered.groupby('segment').agg({'revenue':'sum','churn_flag':'sum','customer_id':'nunique'}).reset_index()
 st.dataframe(by_segment)
 
 st.markdown("**Visualizations of churn by segment / city**")
-seg_chart = alt.Chart(df_filtered).mark_bar().encode(x='segment:N', y='churn_flag:Q', color='city:N')
+seg_chart = alt.Chart(seg_city_churn).mark_bar().encode(x='segment:N', y='churn_flag:Q', color='city:N')
 st.altair_chart(seg_chart, use_container_width=True)
 
 # Support issue insights (placeholder based on dataset fields)
 st.subheader("Support / Issue Insights")
 if 'ticket_count' in df_filtered.columns:
-    tickets = df_filtered.groupby('customer_id').agg({'ticket_count':'sum'}).reset_index().sort_values('ticket_count', ascending=False).head(10)
+    tickets = df_filtered.groupby('customer_id', observed=True).agg({'ticket_count':'sum'}).reset_index().sort_values('ticket_count', ascending=False).head(10)
     st.write(tickets)
 else:
     st.write("No ticket data in dataset; show top customers by refunds / complaints if present")
@@ -227,80 +233,96 @@ class AuthManager:
 # Data loading, cleaning, segmentation, and helper functions
 
 # === data_utils.py ===
+import os
+import importlib.util
+import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime
+
+# common possible columns used in app
+# order id, customer id, customer name, email, order date, revenue, city, segment, status, tickets
+POSSIBLE_COLUMNS = {
+    'order_id':['order_id','orderid','invoice_id'],
+    'customer_id':['customer_id','cust_id','customerid'],
+    'customer_name':['customer_name','name','customer'],
+    'email':['email','cust_email'],
+    'order_date':['order_date','date','purchase_date'],
+    'revenue':['amount','revenue','spent','price','total'],
+    'city':['city','location'],
+    'segment':['segment','cust_segment'],
+    'status':['status','cust_status'],
+    'ticket_count':['ticket_count','tickets']
+}
+# reverse lookup alias -> canonical name, built once per interpreter
+ALIAS_TO_CANONICAL = {o: canonical for canonical, options in POSSIBLE_COLUMNS.items() for o in options}
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+# pyarrow's CSV reader is multithreaded; fall back to the C engine when it isn't installed
+CSV_ENGINE = 'pyarrow' if HAS_PYARROW else 'c'
+# arrow-backed strings route .str.lower/.str.contains/.isin to pyarrow.compute kernels
+STRING_DTYPE = 'string[pyarrow]' if HAS_PYARROW else 'string'
+
+# int64 view of NaT; used as the "no order yet" sentinel for last order date
+_NAT_I8 = np.iinfo(np.int64).min
+
+# numba is optional and heavy to import: customer_rfm builds its JIT kernel on first
+# call (None = not tried yet, False = numba unavailable, fall back to numpy)
+_rfm_kernel = None
+
+def _get_rfm_kernel():
+    global _rfm_kernel
+    if _rfm_kernel is None:
+        try:
+            from numba import njit, prange
+        except ImportError:
+            _rfm_kernel = False
+            return None
+
+        @njit(parallel=True)
+        def kernel(order, offsets, dates, rev):
+            # rows are grouped per customer code via (order, offsets); one parallel pass per customer
+            n = offsets.shape[0] - 1
+            monetary = np.zeros(n)
+            frequency = np.zeros(n)
+            last = np.full(n, _NAT_I8)
+            for k in prange(n):
+                for j in range(offsets[k], offsets[k + 1]):
+                    i = order[j]
+                    monetary[k] += rev[i]
+                    frequency[k] += 1.0
+                    if dates[i] > last[k]:
+                        last[k] = dates[i]
+            return monetary, frequency, last
+
+        _rfm_kernel = kernel
+    return _rfm_kernel or None
 
 class DataManager:
     def __init__(self, csv_path: str):
         self.csv_path = csv_path
 
     def load_raw(self):
-        df = pd.read_csv(self.csv_path)
+        # read only the columns we know how to map, parsing dates in the same pass
+        header = pd.read_csv(self.csv_path, nrows=0).columns
+        usecols = [c for c in header if c in ALIAS_TO_CANONICAL] or None
+        date_cols = [c for c in (usecols or []) if c in POSSIBLE_COLUMNS['order_date']]
+        try:
+            df = pd.read_csv(self.csv_path, engine=CSV_ENGINE, usecols=usecols, parse_dates=date_cols)
+        except (pd.errors.ParserError, ValueError):
+            if CSV_ENGINE == 'c':
+                raise
+            # the pyarrow reader rejects ragged rows; the C engine pads them with NaN
+            df = pd.read_csv(self.csv_path, engine='c', usecols=usecols, parse_dates=date_cols)
         return df
 
     def load_and_prepare(self):
-        df = self.load_raw()
-        # Basic cleaning and normalization (adapt to your CSV's columns)
-        # Try to be robust in case column names vary; map common names
-        col_map = {}
-        # common possible columns used in app
-        # order id, customer id, customer name, email, order date, revenue, city, segment, status, tickets
-        possible = {
-            'order_id':['order_id','orderid','invoice_id'],
-            'customer_id':['customer_id','cust_id','customerid'],
-            'customer_name':['customer_name','name','customer'],
-            'email':['email','cust_email'],
-            'order_date':['order_date','date','purchase_date'],
-            'revenue':['amount','revenue','spent','price','total'],
-            'city':['city','location'],
-            'segment':['segment','cust_segment'],
-            'status':['status','cust_status'],
-            'ticket_count':['ticket_count','tickets']
-        }
-        for canonical, options in possible.items():
-            for o in options:
-                if o in df.columns:
-                    col_map[o] = canonical
-        df = df.rename(columns=col_map)
-
-        # fill missing expected columns
-        for c in ['order_id','customer_id','customer_name','order_date','revenue','city','segment','status']:
-            if c not in df.columns:
-                df[c] = np.nan
-
-        # convert date
-        try:
-            df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
-        except Exception:
-            df['order_date'] = pd.NaT
-
-        # revenue numeric
-        df['revenue'] = pd.to_numeric(df['revenue'], errors='coerce').fillna(0)
-
-        # simple churn flag logic: if status column exists and equals 'churned' or 'inactive'
-        df['status'] = df['status'].fillna('active')
-        df['churn_flag'] = df['status'].apply(lambda x: 1 if str(x).lower() in ('churned','inactive','lost') else 0)
-
-        # create order_month for trends
-        df['order_month'] = df['order_date'].dt.to_period('M').dt.to_timestamp()
-
-        # fill customer_name
-        df['customer_name'] = df['customer_name'].fillna('Unknown')
-
-        # ensure ids are strings
-        df['customer_id'] = df['customer_id'].astype(str)
-        df['order_id'] = df['order_id'].astype(str)
-
-        # default segment and city
-        df['segment'] = df['segment'].fillna('Unknown')
-        df['city'] = df['city'].fillna('Unknown')
-
-        return df
+        # keyed on mtime so an updated CSV invalidates the cache
+        return load_and_prepare(self.csv_path, os.path.getmtime(self.csv_path))
 
     def search_customers(self, df, term):
         term = str(term).lower()
-        out = df[df['customer_name'].str.lower().str.contains(term) | df.get('email',pd.Series()).astype(str).str.lower().str.contains(term)]
+        # literal substring match on the lowercased columns prepared in load_and_prepare
+        out = df[df['customer_name_lc'].str.contains(term, regex=False, na=False) | df['email_lc'].str.contains(term, regex=False, na=False)]
         if out.empty:
             return pd.DataFrame()
         return out[['customer_id','customer_name','email','city','segment']].drop_duplicates().reset_index(drop=True)
@@ -315,13 +337,135 @@ class DataManager:
         }
         return {'summary': summary, 'transactions': cust_df[['order_date','order_id','revenue','city','segment']].reset_index(drop=True)}
 
+# max_entries=1: a new CSV mtime replaces the previous frame instead of piling up copies
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_and_prepare(csv_path: str, mtime: float) -> pd.DataFrame:
+    # Cached per (csv_path, mtime): Streamlit reruns the script on every widget
+    # interaction, so the cleaning pipeline below only runs once per CSV version.
+    df = DataManager(csv_path).load_raw()
+    # Basic cleaning and normalization (adapt to your CSV's columns)
+    # Try to be robust in case column names vary; map common names
+    df = df.rename(columns={c: ALIAS_TO_CANONICAL[c] for c in df.columns if c in ALIAS_TO_CANONICAL})
+
+    # fill missing expected columns
+    for c in ['order_id','customer_id','customer_name','order_date','revenue','city','segment','status']:
+        if c not in df.columns:
+            df[c] = np.nan
+
+    # convert date
+    try:
+        df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
+    except Exception:
+        df['order_date'] = pd.NaT
+
+    # revenue numeric
+    df['revenue'] = pd.to_numeric(df['revenue'], errors='coerce').fillna(0)
+
+    # simple churn flag logic: if status column exists and equals 'churned' or 'inactive'
+    df['status'] = df['status'].fillna('active')
+    df['churn_flag'] = df['status'].astype(STRING_DTYPE).str.lower().isin(('churned','inactive','lost')).astype('int8')
+
+    # create order_month for trends
+    # truncate datetime64 values to month directly rather than round-tripping through Periods
+    df['order_month'] = df['order_date'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+
+    # fill customer_name
+    df['customer_name'] = df['customer_name'].fillna('Unknown')
+
+    # lowercased search columns, computed once here instead of on every search keystroke
+    df['customer_name_lc'] = df['customer_name'].astype(STRING_DTYPE).str.lower()
+    if 'email' in df.columns:
+        df['email_lc'] = df['email'].astype(STRING_DTYPE).str.lower()
+    else:
+        df['email_lc'] = pd.Series(pd.NA, index=df.index, dtype=STRING_DTYPE)
+
+    # ids as categoricals straight from their parsed dtype: nunique/groupby work on int codes, no str() pass
+    df['customer_id'] = df['customer_id'].astype('category')
+    df['order_id'] = df['order_id'].astype('category')
+
+    # default segment and city
+    df['segment'] = df['segment'].fillna('Unknown')
+    df['city'] = df['city'].fillna('Unknown')
+
+    # low-cardinality columns as categoricals: int codes make filters and groupbys cheap
+    for c in ('city','segment','status'):
+        df[c] = df[c].astype('category')
+
+    # sidebar filter options, cached with the frame (categories are already the unique values)
+    df.attrs['city_options'] = sorted(df['city'].cat.categories)
+    df.attrs['segment_options'] = sorted(df['segment'].cat.categories)
+
+    return df
+
+def customer_rfm(df, as_of=None):
+    # per-customer recency (days from last order to as_of), frequency (rows) and monetary (revenue sum);
+    # as_of defaults to today so recency doesn't shift with whatever subset of df is passed in
+    as_of = pd.Timestamp.today().normalize() if as_of is None else pd.Timestamp(as_of)
+    codes = df['customer_id'].cat.codes.to_numpy()
+    # rows with a missing customer_id have code -1 and are left out
+    known = codes >= 0
+    codes = codes[known]
+    dates = df['order_date'].to_numpy().astype('datetime64[ns]').view('i8')[known]
+    rev = df['revenue'].to_numpy(dtype='float64')[known]
+    n = len(df['customer_id'].cat.categories)
+    kernel = _get_rfm_kernel()
+    if kernel is not None:
+        order = np.argsort(codes, kind='stable')
+        offsets = np.searchsorted(codes[order], np.arange(n + 1))
+        monetary, frequency, last = kernel(order, offsets, dates, rev)
+    else:
+        monetary = np.bincount(codes, weights=rev, minlength=n)
+        frequency = np.bincount(codes, minlength=n).astype('float64')
+        last = np.full(n, _NAT_I8)
+        np.maximum.at(last, codes, dates)
+    seen = frequency > 0
+    last_active = pd.to_datetime(last[seen])
+    return pd.DataFrame({
+        'customer_id': df['customer_id'].cat.categories[seen],
+        'recency_days': (as_of - last_active).days,
+        'frequency': frequency[seen].astype('int64'),
+        'monetary': monetary[seen],
+    })
+
+def _category_mask(series, values):
+    # compare categorical int codes instead of strings; -1 (value not a category) is dropped
+    codes = series.cat.categories.get_indexer(list(values))
+    return np.isin(series.cat.codes.to_numpy(), codes[codes >= 0])
+
+def filter_frame(df, city_filter, segment_filter, date_range):
+    # build a single boolean mask in place rather than ANDing four Series temporaries
+    mask = _category_mask(df['city'], city_filter)
+    mask &= _category_mask(df['segment'], segment_filter)
+    dates = df['order_date'].to_numpy()
+    mask &= dates >= pd.to_datetime(date_range[0]).to_datetime64()
+    mask &= dates <= pd.to_datetime(date_range[1]).to_datetime64()
+    return df.loc[mask]
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def filtered_aggregates(csv_path: str, mtime: float, city_filter, segment_filter, date_range, _df_filtered):
+    # Keyed on the CSV version and the sidebar filters, so reruns that don't touch them
+    # (search box, customer selectbox) reuse the trend/segment tables and the customer list.
+    # _df_filtered is the caller's already-filtered frame; the leading underscore keeps
+    # Streamlit from hashing it, so a miss neither re-filters nor unpickles another copy.
+    df_filtered = _df_filtered
+    # one groupby pass for both monthly trends
+    trend = df_filtered.groupby('order_month', observed=True).agg(revenue=('revenue','sum'), churn_flag=('churn_flag','sum')).reset_index()
+    rev_trend = trend[['order_month','revenue']]
+    churn_trend = trend[['order_month','churn_flag']]
+    by_segment = df_filtered.groupby('segment', observed=True).agg({'revenue':'sum','churn_flag':'sum','customer_id':'nunique'}).reset_index()
+    # pre-aggregated for the stacked churn chart so only segment x city rows are sent to the browser
+    seg_city_churn = df_filtered.groupby(['segment','city'], observed=True)['churn_flag'].sum().reset_index()
+    customer_options = sorted(df_filtered['customer_name'].dropna().unique())
+    return rev_trend, churn_trend, by_segment, seg_city_churn, customer_options
+
 # ------------------------- requirements.txt -------------------------
 # streamlit
 # pymongo
 # bcrypt
+# argon2-cffi
 # pandas
 # numpy
-# matplotlib
+# numba (optional)
 # altair
 
 # ------------------------- End of code bundle -------------------------
@@ -329,7 +473,7 @@ class DataManager:
 # Notes:
 # 1) Copy the parts into three files: app.py, auth.py, data_utils.py. Install packages from requirements.txt.
 # 2) Configure Streamlit secrets to include your MongoDB URI (recommended) or let the app use a local JSON fallback.
-# 3) The code assumes a flexible CSV; column-mapping tries to detect common column names. If your CSV has different names, adjust data_utils.col_map.
+# 3) The code assumes a flexible CSV; column-mapping tries to detect common column names. If your CSV has different names, adjust data_utils.POSSIBLE_COLUMNS.
 # 4) The admin default account is created automatically when using MongoDB. Default admin credentials are `admin` / `admin123` - please change.
 # 5) This is a starting implementation that fulfills the requested features: login/admin user creation (via MongoDB), reads attached CSV, data cleaning, visualizations, filters, customer explorer, churn analysis, and support insights placeholder.
 
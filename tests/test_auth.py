@@ -0,0 +1,147 @@
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+AUTH = Path(__file__).resolve().parents[1] / "auth.py"
+
+
+def _load_auth():
+    spec = importlib.util.spec_from_file_location("auth", AUTH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def auth():
+    return _load_auth()
+
+
+def _write_store(path, data, mtime=None):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def store(tmp_path):
+    # one existing user so AuthManager doesn't seed the default admin off-thread
+    path = tmp_path / "local_users.json"
+    _write_store(path, {"users": {"bob": {"username": "bob", "password": "devhash$pw", "role": "user"}}})
+    return path
+
+
+def test_list_store_is_migrated_in_memory(auth, tmp_path):
+    path = tmp_path / "local_users.json"
+    legacy = [{"username": "bob", "password": "devhash$pw", "role": "admin"}]
+    _write_store(path, legacy)
+    mgr = auth.AuthManager(str(path))
+    assert mgr.authenticate("bob", "pw") == {"username": "bob", "role": "admin"}
+    # reading never writes; the file keeps its old format until the next create_user
+    assert json.loads(path.read_text(encoding="utf-8")) == legacy
+    mgr.create_user("alice", "secret")
+    users = json.loads(path.read_text(encoding="utf-8"))["users"]
+    assert set(users) == {"bob", "alice"}
+
+
+def test_list_store_on_read_only_path_does_not_raise(auth, tmp_path, monkeypatch):
+    path = tmp_path / "local_users.json"
+    _write_store(path, [{"username": "bob", "password": "devhash$pw", "role": "user"}])
+
+    def read_only(self, data):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr(auth.AuthManager, "_write_local", read_only)
+    mgr = auth.AuthManager(str(path))
+    assert mgr.authenticate("bob", "pw") == {"username": "bob", "role": "user"}
+
+
+def test_create_user_rejects_duplicate(auth, store):
+    mgr = auth.AuthManager(str(store))
+    mgr.create_user("alice", "secret")
+    with pytest.raises(ValueError, match="user exists"):
+        mgr.create_user("alice", "other")
+    with pytest.raises(ValueError, match="user exists"):
+        mgr.create_user(" bob ", "other")
+
+
+def test_authenticate_after_write(auth, store):
+    mgr = auth.AuthManager(str(store))
+    mgr.create_user("alice", "secret", role="admin")
+    assert mgr.authenticate("alice", "secret") == {"username": "alice", "role": "admin"}
+    assert mgr.authenticate("alice", "wrong") is None
+    # a fresh manager reads the same user back from disk
+    assert auth.AuthManager(str(store)).authenticate("alice", "secret") is not None
+
+
+def test_failed_write_leaves_cache_untouched(auth, store, monkeypatch):
+    mgr = auth.AuthManager(str(store))
+
+    def disk_full(data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(mgr, "_write_local", disk_full)
+    with pytest.raises(OSError):
+        mgr.create_user("ghost", "pw")
+    assert mgr.authenticate("ghost", "pw") is None
+
+
+def test_cache_invalidated_when_mtime_changes(auth, store):
+    mgr = auth.AuthManager(str(store))
+    assert mgr.authenticate("bob", "pw") is not None
+    mtime = os.path.getmtime(store)
+    _write_store(store, {"users": {"carol": {"username": "carol", "password": "devhash$c", "role": "user"}}}, mtime + 10)
+    assert mgr.authenticate("bob", "pw") is None
+    assert mgr.authenticate("carol", "c") == {"username": "carol", "role": "user"}
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (None, 12),
+    ("10", 10),
+    ("abc", 12),
+    ("", 12),
+    ("2", 4),
+    ("40", 31),
+])
+def test_bcrypt_cost_from_env(auth, monkeypatch, raw, expected):
+    if raw is None:
+        monkeypatch.delenv("BCRYPT_COST", raising=False)
+    else:
+        monkeypatch.setenv("BCRYPT_COST", raw)
+    assert auth._bcrypt_cost() == expected
+
+
+def test_import_survives_malformed_bcrypt_cost(monkeypatch):
+    monkeypatch.setenv("BCRYPT_COST", "twelve")
+    assert _load_auth().BCRYPT_COST == 12
+
+
+def test_new_password_hashes_with_argon2(auth):
+    pytest.importorskip("argon2")
+    stored = auth._hash_pw("s3cret")
+    assert stored.startswith("$argon2")
+    assert auth._check_pw("s3cret", stored)
+    assert not auth._check_pw("wrong", stored)
+
+
+def test_existing_bcrypt_hash_still_verifies(auth):
+    bcrypt = pytest.importorskip("bcrypt")
+    stored = bcrypt.hashpw(b"s3cret", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    assert stored.startswith("$2b$")
+    assert auth._check_pw("s3cret", stored)
+    assert not auth._check_pw("wrong", stored)
+
+
+def test_devhash_still_verifies(auth):
+    assert auth._check_pw("pw", "devhash$pw")
+    assert not auth._check_pw("other", "devhash$pw")
+
+
+@pytest.mark.parametrize("stored", ["", None, "plaintext", "$2b$not-a-real-hash", "$argon2id$garbage", "$2"])
+def test_missing_or_malformed_hash_is_rejected(auth, stored):
+    assert auth._check_pw("pw", stored) is False
@@ -0,0 +1,98 @@
+import types
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+CODE = Path(__file__).resolve().parents[1] / "code.py"
+
+
+def _load_data_utils():
+    # data_utils.py still lives inside the code.py bundle; load just that section
+    src = CODE.read_text(encoding="utf-8")
+    start = src.index("# === data_utils.py ===")
+    end = src.index("# ------------------------- requirements.txt")
+    mod = types.ModuleType("data_utils")
+    exec(compile(src[start:end], str(CODE), "exec"), mod.__dict__)
+    return mod
+
+
+@pytest.fixture
+def data_utils():
+    return _load_data_utils()
+
+
+@pytest.fixture
+def ragged_csv(tmp_path):
+    path = tmp_path / "ragged.csv"
+    path.write_text(
+        "order_id,customer_id,customer_name,order_date,amount,city,segment\n"
+        "1,10,Asha,2024-01-05,100,Pune,Retail\n"
+        "2,11,Ravi,2024-02-10,250,Delhi\n"
+        "3,10,Asha,2024-02-11,75,Pune,Retail\n",
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_load_raw_pads_ragged_rows(data_utils, ragged_csv):
+    df = data_utils.DataManager(ragged_csv).load_raw()
+    assert len(df) == 3
+    assert pd.isna(df.loc[1, "segment"])
+    assert pd.api.types.is_datetime64_any_dtype(df["order_date"])
+
+
+def test_load_raw_falls_back_from_pyarrow(data_utils, ragged_csv, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(data_utils, "CSV_ENGINE", "pyarrow")
+    df = data_utils.DataManager(ragged_csv).load_raw()
+    assert len(df) == 3
+    assert pd.isna(df.loc[1, "segment"])
+
+
+@pytest.fixture(params=["numba", "numpy"])
+def rfm_path(request, data_utils, monkeypatch):
+    if request.param == "numba":
+        pytest.importorskip("numba")
+    else:
+        # False marks numba as unavailable, forcing the bincount/maximum.at path
+        monkeypatch.setattr(data_utils, "_rfm_kernel", False)
+    return request.param
+
+
+def test_customer_rfm_measures_recency_from_as_of(data_utils, rfm_path):
+    df = pd.DataFrame({
+        "customer_id": pd.Categorical([10, 11, 10]),
+        "order_date": pd.to_datetime(["2024-01-05", "2024-02-10", "2024-02-11"]),
+        "revenue": [100.0, 250.0, 75.0],
+    })
+    rfm = data_utils.customer_rfm(df, as_of="2024-03-01").set_index("customer_id")
+    assert rfm.loc[10, "recency_days"] == 19
+    assert rfm.loc[11, "recency_days"] == 20
+    assert rfm.loc[10, "frequency"] == 2
+    assert rfm.loc[10, "monetary"] == 175.0
+    # a subset keeps the same reference date, so recency doesn't move with filters
+    subset = data_utils.customer_rfm(df.iloc[:2], as_of="2024-03-01").set_index("customer_id")
+    assert subset.loc[11, "recency_days"] == 20
+
+
+def test_customer_rfm_paths_agree(data_utils, monkeypatch):
+    pytest.importorskip("numba")
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    n = 500
+    ids = rng.integers(0, 40, n).astype("float64")
+    ids[::37] = np.nan  # missing customer_id rows are skipped
+    dates = pd.Series(pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"))
+    dates[::53] = pd.NaT
+    df = pd.DataFrame({
+        "customer_id": pd.Categorical(ids),
+        "order_date": dates,
+        "revenue": rng.random(n) * 100,
+    })
+    with_numba = data_utils.customer_rfm(df, as_of="2025-01-01")
+    monkeypatch.setattr(data_utils, "_rfm_kernel", False)
+    with_numpy = data_utils.customer_rfm(df, as_of="2025-01-01")
+    pd.testing.assert_frame_equal(with_numba, with_numpy)